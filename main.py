@@ -1,21 +1,47 @@
 from fastapi import FastAPI, HTTPException, UploadFile, File
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, ORJSONResponse
 from pydantic import BaseModel
-from typing import List, Optional, Dict
+from typing import Any, List, Optional, Dict, Tuple
 from datetime import datetime, timezone
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from collections import OrderedDict
 import os
 from dotenv import load_dotenv
-import json
-import uuid
+import orjson
+import secrets
 import re
+import asyncio
+import anyio
+import hashlib
+import threading
+import tempfile
+import shutil
+import glob
+import gc
+import io
+import httpx
+import posixpath
+from urllib.parse import quote, unquote
+from starlette.routing import Match
+
 
+# Split by periods, question marks, exclamation marks, or existing newlines
+_SENT_SPLIT = re.compile(r'(?<=[.!?])\s+|\n')
+# Numbered questions ("1. ...") up to the next numbered line or end of text
+_QUESTION_PAT = re.compile(r'(\d+\..+?)(?=\n\d+\.|\Z)', re.DOTALL)
+_QUESTION_START = re.compile(r'\d+\.')
+_QUESTION_BOUNDARY = re.compile(r'\n\d+\.')
+# Markdown code fence (optionally tagged json) wrapping a Gemini JSON reply
+_FENCE_RE = re.compile(r'^\s*```(?:json)?\s*|\s*```\s*$', re.IGNORECASE)
+# Reference to an earlier batch response, e.g. {{1.body.id}}
+_BATCH_REF = re.compile(r'\{\{\s*([^.{}\s]+)((?:\.[^.{}\s]+)*)\s*\}\}')
 
 
 def split_lines(text):
-    # Split by periods, question marks, exclamation marks, or existing newlines
-    lines = re.split(r'(?<=[.!?])\s+|\n', text)
+    lines = _SENT_SPLIT.split(text)
     # Remove empty lines
     lines = [line.strip() for line in lines if line.strip()]
     return "\n".join(lines)
@@ -28,14 +54,74 @@ except ImportError:
     GENAI_AVAILABLE = False
     print("Warning: google-generativeai not properly installed")
 
+try:
+    import fitz  # PyMuPDF
+    PYMUPDF_AVAILABLE = True
+except ImportError:
+    PYMUPDF_AVAILABLE = False
+    print("Warning: PyMuPDF not installed, falling back to pdfplumber for PDF extraction")
+
 try:
     import pdfplumber
 except ImportError:
     print("Warning: pdfplumber not installed, PDF extraction will fail")
 
+try:
+    from sentence_transformers import SentenceTransformer
+    import numpy as np
+    SEMANTIC_CACHE_AVAILABLE = True
+except ImportError:
+    SEMANTIC_CACHE_AVAILABLE = False
+    print("Warning: sentence-transformers not installed, semantic response cache disabled")
+
+try:
+    import diskcache
+    DISKCACHE_AVAILABLE = True
+except ImportError:
+    DISKCACHE_AVAILABLE = False
+    print("Warning: diskcache not installed, cached responses will not survive restarts")
+
+try:
+    import redis.asyncio as aioredis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
 load_dotenv()
 
-app = FastAPI(title="Find AI - Educational Chatbot")
+# Worker threads available for blocking work (PDF parsing, upload spooling) offloaded from the event loop
+THREAD_POOL_SIZE = 32
+
+# Shared storage; without it chats, messages and files live in process memory
+REDIS_URL = os.getenv("REDIS_URL", "")
+USE_REDIS = bool(REDIS_URL) and REDIS_AVAILABLE
+if REDIS_URL and not REDIS_AVAILABLE:
+    print("Warning: redis not installed, falling back to in-memory storage")
+
+# Uvicorn worker processes. In-memory storage is per-process, so it stays on one worker.
+WORKERS = int(os.getenv("WORKERS", str(max(2, os.cpu_count() or 1) if USE_REDIS else 1)))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    loop = asyncio.get_running_loop()
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=THREAD_POOL_SIZE))
+    # Starlette's run_in_threadpool (e.g. UploadFile reads) goes through AnyIO's limiter instead
+    anyio.to_thread.current_default_thread_limiter().total_tokens = THREAD_POOL_SIZE
+    gemini_batcher.start()
+    if not USE_REDIS:
+        remove_stale_extracted_text_dirs()
+    yield
+    await gemini_batcher.stop()
+    if not USE_REDIS and _extracted_text_dir is not None:
+        shutil.rmtree(_extracted_text_dir, ignore_errors=True)
+    await storage.close()
+    _PDF_POOL.shutdown(wait=False, cancel_futures=True)
+
+app = FastAPI(
+    title="Find AI - Educational Chatbot",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
+)
 
 app.add_middleware(
     CORSMiddleware,
@@ -53,11 +139,251 @@ if GENAI_AVAILABLE:
     genai.configure(api_key=GOOGLE_API_KEY)
 
 # ----------------------
-# In-memory storage
+# Storage
 # ----------------------
-memory_chats: Dict[str, dict] = {}
-memory_messages: Dict[str, dict] = {}
-memory_files: Dict[str, dict] = {}
+class InMemoryStorage:
+    """Per-process storage; data is lost on restart."""
+
+    def __init__(self):
+        self.chats: Dict[str, dict] = {}
+        self.messages: Dict[str, dict] = {}
+        self.files: Dict[str, dict] = {}
+        # Secondary indexes by chat_id, kept in insertion order
+        self.messages_by_chat: Dict[str, List[dict]] = {}
+        self.files_by_chat: Dict[str, List[dict]] = {}
+
+    async def close(self):
+        pass
+
+    async def list_chats(self) -> List[dict]:
+        return sorted(self.chats.values(), key=lambda x: x['updated_at'], reverse=True)
+
+    async def get_chat(self, chat_id: str) -> Optional[dict]:
+        return self.chats.get(chat_id)
+
+    async def create_chat(self, chat_doc: dict):
+        self.chats[chat_doc['id']] = chat_doc
+
+    async def delete_chat(self, chat_id: str) -> List[dict]:
+        """Delete a chat with its messages and files, returning the deleted file docs."""
+        for m in self.messages_by_chat.pop(chat_id, []):
+            self.messages.pop(m['id'], None)
+        files = self.files_by_chat.pop(chat_id, [])
+        for f in files:
+            self.files.pop(f['id'], None)
+        self.chats.pop(chat_id, None)
+        return files
+
+    async def add_message(self, message_doc: dict, updated_at: Optional[str] = None) -> bool:
+        """Store a message, returning False (and storing nothing) if its chat is gone."""
+        chat = self.chats.get(message_doc['chat_id'])
+        if chat is None:
+            return False
+        self.messages[message_doc['id']] = message_doc
+        self.messages_by_chat.setdefault(message_doc['chat_id'], []).append(message_doc)
+        if updated_at:
+            chat["updated_at"] = updated_at
+        return True
+
+    async def get_messages(self, chat_id: str, last: Optional[int] = None) -> List[dict]:
+        # Messages are appended in chronological order, so the index is already sorted
+        messages = self.messages_by_chat.get(chat_id, [])
+        return messages[-last:] if last else messages
+
+    async def add_file(self, file_doc: dict) -> bool:
+        """Store a file doc, returning False (and storing nothing) if its chat is gone."""
+        if file_doc['chat_id'] not in self.chats:
+            return False
+        self.files[file_doc['id']] = file_doc
+        self.files_by_chat.setdefault(file_doc['chat_id'], []).append(file_doc)
+        return True
+
+    async def get_files(self, chat_id: str) -> List[dict]:
+        return self.files_by_chat.get(chat_id, [])
+
+class RedisStorage:
+    """Redis storage shared by all workers.
+
+    Layout: `chat:{id}` / `msg:{id}` / `file:{id}` hashes with orjson-encoded
+    field values, `chat:{id}:messages` and `chat:{id}:files` lists of ids in
+    insertion order, and a `chats` sorted set scored by `updated_at`.
+    """
+
+    # Adds a message only while its chat exists, so a chat deleted during a Gemini call
+    # is not recreated as a bare `updated_at` hash.
+    # KEYS: msg hash, chat message list, chat hash, chats zset
+    # ARGV: chat id, message id, encoded updated_at or "", score, message field/value pairs...
+    _ADD_MESSAGE_LUA = """
+if redis.call('EXISTS', KEYS[3]) == 0 then
+    return 0
+end
+redis.call('HSET', KEYS[1], unpack(ARGV, 5))
+redis.call('RPUSH', KEYS[2], ARGV[2])
+if ARGV[3] ~= '' then
+    redis.call('HSET', KEYS[3], 'updated_at', ARGV[3])
+    redis.call('ZADD', KEYS[4], ARGV[4], ARGV[1])
+end
+return 1
+"""
+
+    # Same guard for file docs.
+    # KEYS: file hash, chat file list, chat hash
+    # ARGV: file id, file field/value pairs...
+    _ADD_FILE_LUA = """
+if redis.call('EXISTS', KEYS[3]) == 0 then
+    return 0
+end
+redis.call('HSET', KEYS[1], unpack(ARGV, 2))
+redis.call('RPUSH', KEYS[2], ARGV[1])
+return 1
+"""
+
+    # Reads the message and file ids in the same atomic step that deletes them, so
+    # nothing added concurrently is left behind. Returns the deleted file hashes.
+    # KEYS: chat hash, chat message list, chat file list, chats zset
+    # ARGV: chat id
+    _DELETE_CHAT_LUA = """
+for _, id in ipairs(redis.call('LRANGE', KEYS[2], 0, -1)) do
+    redis.call('DEL', 'msg:' .. id)
+end
+local files = {}
+for _, id in ipairs(redis.call('LRANGE', KEYS[3], 0, -1)) do
+    local fields = redis.call('HGETALL', 'file:' .. id)
+    if #fields > 0 then
+        table.insert(files, fields)
+    end
+    redis.call('DEL', 'file:' .. id)
+end
+redis.call('DEL', KEYS[1], KEYS[2], KEYS[3])
+redis.call('ZREM', KEYS[4], ARGV[1])
+return files
+"""
+
+    def __init__(self, url: str):
+        self.redis = aioredis.from_url(url)
+        self._add_message_script = self.redis.register_script(self._ADD_MESSAGE_LUA)
+        self._add_file_script = self.redis.register_script(self._ADD_FILE_LUA)
+        self._delete_chat_script = self.redis.register_script(self._DELETE_CHAT_LUA)
+
+    async def close(self):
+        await self.redis.aclose()
+
+    @staticmethod
+    def _encode(doc: dict) -> dict:
+        return {k: orjson.dumps(v) for k, v in doc.items()}
+
+    @staticmethod
+    def _decode(fields: dict) -> dict:
+        return {k.decode(): orjson.loads(v) for k, v in fields.items()}
+
+    @staticmethod
+    def _score(timestamp: str) -> float:
+        return datetime.fromisoformat(timestamp).timestamp()
+
+    async def _get_docs(self, prefix: str, ids: List[bytes]) -> List[dict]:
+        if not ids:
+            return []
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for doc_id in ids:
+                pipe.hgetall(f"{prefix}:{doc_id.decode()}")
+            results = await pipe.execute()
+        return [self._decode(fields) for fields in results if fields]
+
+    async def list_chats(self) -> List[dict]:
+        return await self._get_docs("chat", await self.redis.zrevrange("chats", 0, -1))
+
+    async def get_chat(self, chat_id: str) -> Optional[dict]:
+        fields = await self.redis.hgetall(f"chat:{chat_id}")
+        return self._decode(fields) if fields else None
+
+    async def create_chat(self, chat_doc: dict):
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hset(f"chat:{chat_doc['id']}", mapping=self._encode(chat_doc))
+            pipe.zadd("chats", {chat_doc['id']: self._score(chat_doc['updated_at'])})
+            await pipe.execute()
+
+    async def delete_chat(self, chat_id: str) -> List[dict]:
+        """Delete a chat with its messages and files, returning the deleted file docs."""
+        files = await self._delete_chat_script(
+            keys=[f"chat:{chat_id}", f"chat:{chat_id}:messages", f"chat:{chat_id}:files", "chats"],
+            args=[chat_id]
+        )
+        return [self._decode(dict(zip(fields[::2], fields[1::2]))) for fields in files]
+
+    async def add_message(self, message_doc: dict, updated_at: Optional[str] = None) -> bool:
+        """Store a message, returning False (and storing nothing) if its chat is gone."""
+        chat_id = message_doc['chat_id']
+        fields = [part for item in self._encode(message_doc).items() for part in item]
+        added = await self._add_message_script(
+            keys=[f"msg:{message_doc['id']}", f"chat:{chat_id}:messages", f"chat:{chat_id}", "chats"],
+            args=[
+                chat_id,
+                message_doc['id'],
+                orjson.dumps(updated_at) if updated_at else "",
+                self._score(updated_at) if updated_at else 0,
+                *fields
+            ]
+        )
+        return bool(added)
+
+    async def get_messages(self, chat_id: str, last: Optional[int] = None) -> List[dict]:
+        start = -last if last else 0
+        return await self._get_docs("msg", await self.redis.lrange(f"chat:{chat_id}:messages", start, -1))
+
+    async def add_file(self, file_doc: dict) -> bool:
+        """Store a file doc, returning False (and storing nothing) if its chat is gone."""
+        chat_id = file_doc['chat_id']
+        fields = [part for item in self._encode(file_doc).items() for part in item]
+        added = await self._add_file_script(
+            keys=[f"file:{file_doc['id']}", f"chat:{chat_id}:files", f"chat:{chat_id}"],
+            args=[file_doc['id'], *fields]
+        )
+        return bool(added)
+
+    async def get_files(self, chat_id: str) -> List[dict]:
+        return await self._get_docs("file", await self.redis.lrange(f"chat:{chat_id}:files", 0, -1))
+
+storage = RedisStorage(REDIS_URL) if USE_REDIS else InMemoryStorage()
+
+# Assembled file context per chat as (file ids, text, hash), for the most recently used
+# chats. Rebuilt when the chat's files change; the ids detect uploads handled by another worker.
+FILE_CONTEXT_CACHE_SIZE = 32
+file_context_cache: "OrderedDict[str, Tuple[tuple, str, str]]" = OrderedDict()
+
+# Extracted file text lives on disk; file docs only keep the path. Redis-backed docs outlive
+# the process, so their text goes to a shared dir. In-memory docs die with the process, so
+# each process gets its own dir (named after its pid) that is removed on shutdown.
+EXTRACTED_TEXT_PREFIX = "findai-extracted"
+_extracted_text_dir: Optional[str] = None
+
+def get_extracted_text_dir() -> str:
+    global _extracted_text_dir
+    if _extracted_text_dir is None:
+        if USE_REDIS:
+            _extracted_text_dir = os.path.join(tempfile.gettempdir(), EXTRACTED_TEXT_PREFIX)
+            os.makedirs(_extracted_text_dir, exist_ok=True)
+        else:
+            _extracted_text_dir = tempfile.mkdtemp(prefix=f"{EXTRACTED_TEXT_PREFIX}-{os.getpid()}-")
+    return _extracted_text_dir
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        pass
+    return True
+
+def remove_stale_extracted_text_dirs():
+    """Remove per-process extracted text dirs left behind by processes that are gone."""
+    for path in glob.glob(os.path.join(tempfile.gettempdir(), f"{EXTRACTED_TEXT_PREFIX}-*-*")):
+        try:
+            pid = int(os.path.basename(path).split("-")[2])
+        except (IndexError, ValueError):
+            continue
+        if pid != os.getpid() and not _pid_alive(pid):
+            shutil.rmtree(path, ignore_errors=True)
 
 # ----------------------
 # Pydantic Models
@@ -93,6 +419,7 @@ class Question(BaseModel):
     options: Optional[List[str]] = None
     answer: str
 
+# Documents the reply shape; at runtime replies are plain dicts checked by _check_ai_data
 class AIResponse(BaseModel):
     content: str
     has_notes: bool = False
@@ -101,43 +428,460 @@ class AIResponse(BaseModel):
     questions: Optional[List[Question]] = None
     follow_up_actions: Optional[List[str]] = None
 
+class BatchRequestItem(BaseModel):
+    id: str
+    method: str = "GET"
+    url: str
+    body: Optional[Any] = None
+    headers: Optional[Dict[str, str]] = None
+    dependsOn: Optional[List[str]] = None
+
+class BatchRequest(BaseModel):
+    requests: List[BatchRequestItem]
+
+# ----------------------
+# Gemini Request Batching
+# ----------------------
+class DynBatcher:
+    """Coalesce queued items into one handler call.
+
+    Items are dispatched as soon as the batcher is idle; while earlier batches are
+    in flight, a batch stays open for up to `max_delay` seconds to collect more.
+    """
+
+    def __init__(self, handler, max_batch_size: int = 8, max_delay: float = 0.1):
+        self.handler = handler
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._in_flight: set = set()
+
+    def start(self):
+        self._queue = asyncio.Queue()
+        self._worker = asyncio.create_task(self._collect())
+
+    async def stop(self):
+        if self._worker is None:
+            return
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+        if self._in_flight:
+            await asyncio.gather(*self._in_flight, return_exceptions=True)
+
+    async def process(self, item):
+        if self._worker is None:
+            # Not started (e.g. app running without lifespan): dispatch directly
+            result = (await self.handler([item]))[0]
+            if isinstance(result, BaseException):
+                raise result
+            return result
+
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, future))
+        return await future
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self.max_batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            # Only hold a batch open to coalesce more items while earlier ones are in flight;
+            # an idle batcher dispatches immediately
+            if self._in_flight:
+                deadline = loop.time() + self.max_delay
+                while len(batch) < self.max_batch_size:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+
+            # Dispatch without waiting so the next batch can fill while this one is in flight
+            task = asyncio.create_task(self._dispatch(batch))
+            self._in_flight.add(task)
+            task.add_done_callback(self._in_flight.discard)
+
+    async def _dispatch(self, batch):
+        try:
+            results = await self.handler([item for item, _ in batch])
+        except Exception as e:
+            results = [e] * len(batch)
+
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+def _generate_content(model, prompt: str):
+    # Never call the blocking client on the event loop; older SDKs lack the async method
+    if hasattr(model, "generate_content_async"):
+        return model.generate_content_async(prompt)
+    return asyncio.to_thread(model.generate_content, prompt)
+
+async def _generate_content_batch(prompts: List[str]):
+    model = genai.GenerativeModel('gemini-2.0-flash')
+    return await asyncio.gather(
+        *[_generate_content(model, p) for p in prompts],
+        return_exceptions=True
+    )
+
+gemini_batcher = DynBatcher(_generate_content_batch, max_batch_size=8, max_delay=0.1)
+
+# ----------------------
+# Response Cache
+# ----------------------
+RESPONSE_CACHE_SIZE = 1024
+SEMANTIC_CACHE_THRESHOLD = 0.92
+SEMANTIC_CACHE_PER_CONTEXT = 256
+SEMANTIC_CACHE_CONTEXTS = 64
+EMBEDDING_MODEL_NAME = "all-MiniLM-L6-v2"
+
+# Exact tier: LRU of responses keyed by a hash of the full prompt inputs
+_response_cache: "OrderedDict[str, dict]" = OrderedDict()
+_disk_cache = (
+    diskcache.Cache(os.path.join(os.path.dirname(__file__), ".cache", "responses"))
+    if DISKCACHE_AVAILABLE else None
+)
+
+# Semantic tier: (embedding, response) pairs per curriculum/language/file context,
+# for the most recently used contexts
+_semantic_cache: "OrderedDict[str, list]" = OrderedDict()
+_embedding_model = None
+_embedding_model_lock = threading.Lock()
+# Set once the model fails to load (e.g. offline host) so later messages skip the semantic tier
+_embedding_model_failed = False
+
+def _cache_key(*parts: str) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        h.update(part.encode('utf-8'))
+        h.update(b"\x00")
+    return h.hexdigest()
+
+def _remember_response(key: str, response: dict):
+    _response_cache[key] = response
+    _response_cache.move_to_end(key)
+    if len(_response_cache) > RESPONSE_CACHE_SIZE:
+        _response_cache.popitem(last=False)
+
+def get_cached_response(key: str) -> Optional[dict]:
+    cached = _response_cache.get(key)
+    if cached is not None:
+        _response_cache.move_to_end(key)
+        return cached
+
+    if _disk_cache is not None:
+        cached = _disk_cache.get(key)
+        if cached is not None:
+            _remember_response(key, cached)
+            return cached
+    return None
+
+def cache_response(key: str, response: dict):
+    _remember_response(key, response)
+    if _disk_cache is not None:
+        _disk_cache.set(key, response)
+
+def _embed_sync(text: str):
+    global _embedding_model, _embedding_model_failed
+    with _embedding_model_lock:
+        if _embedding_model_failed:
+            return None
+        if _embedding_model is None:
+            try:
+                _embedding_model = SentenceTransformer(EMBEDDING_MODEL_NAME)
+            except Exception as e:
+                _embedding_model_failed = True
+                print(f"Error loading embedding model, semantic response cache disabled: {e}")
+                return None
+    return _embedding_model.encode(text, normalize_embeddings=True)
+
+async def embed_message(text: str):
+    if not SEMANTIC_CACHE_AVAILABLE or _embedding_model_failed:
+        return None
+    try:
+        return await asyncio.to_thread(_embed_sync, text)
+    except Exception as e:
+        print(f"Error embedding message for semantic cache: {e}")
+        return None
+
+def find_similar_response(context_key: str, embedding) -> Optional[dict]:
+    best_score, best_response = SEMANTIC_CACHE_THRESHOLD, None
+    entries = _semantic_cache.get(context_key)
+    if not entries:
+        return None
+    _semantic_cache.move_to_end(context_key)
+    for cached_embedding, response in entries:
+        # Embeddings are normalized, so the dot product is the cosine similarity
+        score = float(np.dot(cached_embedding, embedding))
+        if score >= best_score:
+            best_score, best_response = score, response
+    return best_response
+
+def remember_similar_response(context_key: str, embedding, response: dict):
+    entries = _semantic_cache.setdefault(context_key, [])
+    _semantic_cache.move_to_end(context_key)
+    entries.append((embedding, response))
+    if len(entries) > SEMANTIC_CACHE_PER_CONTEXT:
+        del entries[0]
+    if len(_semantic_cache) > SEMANTIC_CACHE_CONTEXTS:
+        _semantic_cache.popitem(last=False)
+
 # ----------------------
 # Utility Functions
 # ----------------------
-async def extract_text_from_file(file: UploadFile) -> str:
-    content = await file.read()
+# Pages buffered in memory before being flushed to the extracted text file
+PDF_PAGE_BATCH = 32
+
+class ExtractedTextWriter:
+    """Write extracted text to disk, collecting its length and numbered questions as it goes.
+
+    Only the text of the question currently being read is kept in memory, and each
+    write scans just the new text for the next question boundary.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.length = 0
+        self.questions: List[str] = []
+        self._pending = ""
+        self._started = False
+        self._scan_from = 0
+        self._file = open(path, "w", encoding="utf-8")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def write(self, text: str):
+        self._file.write(text)
+        self.length += len(text)
+
+        self._pending += text
+        if not self._started:
+            start = _QUESTION_START.search(self._pending)
+            if not start:
+                # No question started yet; keep a tail in case a number is split across writes
+                self._pending = self._pending[-32:]
+                return
+            self._pending = self._pending[start.start():]
+            self._started = True
+            self._scan_from = 0
+
+        while True:
+            # _pending starts at "N."; the question runs to the first later "\nM." (see _QUESTION_PAT)
+            min_end = _QUESTION_START.match(self._pending).end() + 1
+            boundary = _QUESTION_BOUNDARY.search(self._pending, max(self._scan_from, min_end))
+            if not boundary:
+                break
+            self.questions.append(self._pending[:boundary.start()].strip().replace("\n", " "))
+            self._pending = self._pending[boundary.start() + 1:]
+            self._scan_from = 0
+
+        # Resume the next search where this one stopped, backing up over a "\nN" split across writes
+        newline = self._pending.rfind("\n", self._scan_from)
+        tail = self._pending[newline + 1:]
+        if newline >= 0 and (not tail or tail.isdigit()):
+            self._scan_from = max(newline, min_end)
+        else:
+            self._scan_from = max(len(self._pending), min_end)
+
+    def reset(self):
+        self._file.seek(0)
+        self._file.truncate()
+        self.length = 0
+        self.questions = []
+        self._pending = ""
+        self._started = False
+        self._scan_from = 0
+
+    def close(self):
+        if self._file.closed:
+            return
+        self.questions.extend(extract_questions(self._pending))
+        self._pending = ""
+        self._file.close()
+
+def _write_page_batches(pages, out):
+    batch = []
+    for page_text in pages:
+        batch.append(page_text)
+        batch.append("\n")
+        if len(batch) >= 2 * PDF_PAGE_BATCH:
+            out.write("".join(batch))
+            batch.clear()
+            gc.collect()
+    if batch:
+        out.write("".join(batch))
+
+def _parse_pdf_sync(content: bytes, out: ExtractedTextWriter):
+    if PYMUPDF_AVAILABLE:
+        with fitz.open(stream=content, filetype="pdf") as doc:
+            _write_page_batches((page.get_text() for page in doc), out)
+        return
+
+    with pdfplumber.open(io.BytesIO(content)) as pdf:
+        _write_page_batches((page.extract_text() or "" for page in pdf.pages), out)
+
+# Large PDFs are split into page ranges parsed in separate processes. Every uvicorn worker
+# has its own pool, so the cores are shared between them.
+PDF_PROCESS_WORKERS = int(os.getenv("PDF_PROCESS_WORKERS", str(max(1, (os.cpu_count() or 1) // WORKERS))))
+PDF_PARALLEL_MIN_PAGES = 64
+_PDF_POOL = ProcessPoolExecutor(max_workers=PDF_PROCESS_WORKERS)
+
+def _count_pdf_pages(content: bytes) -> int:
+    if PYMUPDF_AVAILABLE:
+        with fitz.open(stream=content, filetype="pdf") as doc:
+            return doc.page_count
+    with pdfplumber.open(io.BytesIO(content)) as pdf:
+        return len(pdf.pages)
+
+def _extract_page_range(content: bytes, start: int, end: int) -> str:
+    parts = []
+    if PYMUPDF_AVAILABLE:
+        with fitz.open(stream=content, filetype="pdf") as doc:
+            for i in range(start, end):
+                parts.append(doc[i].get_text())
+                parts.append("\n")
+    else:
+        with pdfplumber.open(io.BytesIO(content)) as pdf:
+            for page in pdf.pages[start:end]:
+                parts.append(page.extract_text() or "")
+                parts.append("\n")
+    return "".join(parts)
+
+async def _parse_pdf_parallel(content: bytes, out: ExtractedTextWriter, page_count: int):
+    loop = asyncio.get_running_loop()
+    step = -(-page_count // PDF_PROCESS_WORKERS)
+    futures = [
+        loop.run_in_executor(_PDF_POOL, _extract_page_range, content, start, min(start + step, page_count))
+        for start in range(0, page_count, step)
+    ]
+    try:
+        # Write ranges in page order, releasing each one once it is on disk
+        for future in futures:
+            await asyncio.to_thread(out.write, await future)
+    finally:
+        for future in futures:
+            future.cancel()
+
+# Upload limits, checked before any file content is buffered
+MAX_UPLOAD_SIZE = 20 * 1024 * 1024
+UPLOAD_READ_CHUNK = 1024 * 1024
+
+def _upload_too_large(file: UploadFile) -> HTTPException:
+    return HTTPException(
+        status_code=413,
+        detail=f"File '{file.filename}' exceeds the {MAX_UPLOAD_SIZE // (1024 * 1024)}MB upload limit"
+    )
+
+async def _read_upload(file: UploadFile) -> bytes:
+    buffer = bytearray()
+    while chunk := await file.read(UPLOAD_READ_CHUNK):
+        buffer += chunk
+        if len(buffer) > MAX_UPLOAD_SIZE:
+            raise _upload_too_large(file)
+    return bytes(buffer)
+
+async def extract_text_from_file(file: UploadFile, out: ExtractedTextWriter):
+    """Extract the text of an uploaded file into `out`."""
     text = ""
 
     if file.content_type == "text/plain":
+        content = await _read_upload(file)
         try:
             text = content.decode('utf-8')
         except:
             text = "Unable to decode file content"
 
     elif file.content_type == "application/pdf":
+        content = await _read_upload(file)
         try:
-            import io
-            with pdfplumber.open(io.BytesIO(content)) as pdf:
-                for page in pdf.pages:
-                    page_text = page.extract_text() or ""
-                    text += page_text + "\n"
+            # Parse off the event loop so concurrent requests keep being served
+            page_count = await asyncio.to_thread(_count_pdf_pages, content)
+            if page_count >= PDF_PARALLEL_MIN_PAGES and PDF_PROCESS_WORKERS > 1:
+                await _parse_pdf_parallel(content, out, page_count)
+            else:
+                await asyncio.to_thread(_parse_pdf_sync, content, out)
+            return
         except Exception as e:
+            out.reset()
             text = f"Error extracting PDF text: {str(e)}"
 
     else:
+        # Unsupported types are never buffered
         text = "File uploaded but text extraction not available for this type. Please describe the content."
 
-    return text
+    out.write(text)
+
+def read_extracted_text(path: str) -> str:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return f.read()
+    except OSError:
+        return ""
+
+def remove_extracted_text(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+def _new_id() -> str:
+    # Chat, message and file ids only need to be unique, not cryptographically strong
+    return secrets.token_hex(12)
+
+def build_file_context(files: List[dict]) -> str:
+    parts = []
+    for file in files:
+        parts.append(f"{file['original_name']}:\n")
+        parts.append(read_extracted_text(file['extracted_text_path']))
+        parts.append("\n")
+        if file.get('questions'):
+            parts.append("Questions from this book:\n")
+            for q in file['questions']:
+                parts.append(q + "\n")
+    return "".join(parts)
+
+def get_file_context(chat_id: str, files: List[dict]) -> Tuple[str, str]:
+    """Return the chat's file context and its hash, rebuilding it if the files changed."""
+    file_ids = tuple(f['id'] for f in files)
+    if not file_ids:
+        return "", None
+
+    cached = file_context_cache.get(chat_id)
+    if cached is None or cached[0] != file_ids:
+        file_context = build_file_context(files)
+        cached = (file_ids, file_context, _cache_key(file_context))
+        file_context_cache[chat_id] = cached
+        if len(file_context_cache) > FILE_CONTEXT_CACHE_SIZE:
+            file_context_cache.popitem(last=False)
+    file_context_cache.move_to_end(chat_id)
+    return cached[1], cached[2]
 
 def extract_questions(text: str):
     """Extract numbered questions from text."""
-    pattern = r'(\d+\..+?)(?=\n\d+\.|\Z)'
-    questions = re.findall(pattern, text, flags=re.DOTALL)
-    questions = [q.strip().replace("\n", " ") for q in questions]
-    return questions
+    return [m.group(1).strip().replace("\n", " ") for m in _QUESTION_PAT.finditer(text)]
 
-async def generate_ai_response(user_message: str, curriculum: str, language: str, 
-                               file_context: str = "", previous_messages: List = []):
+# Prompt prefixes (system prompt + file context) reused across turns of the same context
+PROMPT_PREFIX_CACHE_SIZE = 32
+_prompt_prefix_cache: "OrderedDict[str, str]" = OrderedDict()
+
+def _build_prompt_prefix(curriculum: str, language: str, file_context: str) -> str:
     system_prompt = f"""You are Find AI, an intelligent educational chatbot and teaching assistant.
 
 Rules:
@@ -169,37 +913,104 @@ Respond with JSON in this format:
   ] (if has_questions is true),
   "follow_up_actions": ["Generate practice quiz", "Download notes"] (optional)
 }}"""
+    return f"{system_prompt}\n\nConversation history:\n"
+
+def get_prompt_prefix(context_key: str, curriculum: str, language: str, file_context: str) -> str:
+    prefix = _prompt_prefix_cache.get(context_key)
+    if prefix is None:
+        prefix = _build_prompt_prefix(curriculum, language, file_context)
+        _prompt_prefix_cache[context_key] = prefix
+        if len(_prompt_prefix_cache) > PROMPT_PREFIX_CACHE_SIZE:
+            _prompt_prefix_cache.popitem(last=False)
+    else:
+        _prompt_prefix_cache.move_to_end(context_key)
+    return prefix
+
+def _check_bool(data: dict, key: str) -> bool:
+    value = data.get(key, False)
+    if isinstance(value, str) and value.lower() in ("true", "false"):
+        return value.lower() == "true"
+    if not isinstance(value, bool):
+        raise ValueError(f"AI response has malformed '{key}'")
+    return value
+
+def _check_str_list(value, key: str) -> Optional[List[str]]:
+    if value is not None and not (isinstance(value, list) and all(isinstance(v, str) for v in value)):
+        raise ValueError(f"AI response has malformed '{key}'")
+    return value
 
+def _check_question(q) -> dict:
+    if not isinstance(q, dict) or not all(isinstance(q.get(k), str) for k in ("type", "question", "answer")):
+        raise ValueError("AI response has a malformed question")
+    return {
+        "type": q["type"],
+        "question": q["question"],
+        "options": _check_str_list(q.get("options"), "options"),
+        "answer": q["answer"]
+    }
+
+def _check_ai_data(data) -> dict:
+    """Check a parsed Gemini reply against the AIResponse shape and fill in defaults."""
+    if not isinstance(data, dict) or not isinstance(data.get("content"), str):
+        raise ValueError("AI response is missing 'content'")
+    questions = data.get("questions")
+    if questions is not None and not isinstance(questions, list):
+        raise ValueError("AI response has malformed 'questions'")
+    return {
+        "content": data["content"],
+        "has_notes": _check_bool(data, "has_notes"),
+        "notes": _check_str_list(data.get("notes"), "notes"),
+        "has_questions": _check_bool(data, "has_questions"),
+        "questions": [_check_question(q) for q in questions] if questions is not None else None,
+        "follow_up_actions": _check_str_list(data.get("follow_up_actions"), "follow_up_actions")
+    }
+
+async def generate_ai_response(user_message: str, curriculum: str, language: str, 
+                               file_context: str = "", previous_messages: List = [],
+                               file_context_hash: Optional[str] = None) -> dict:
     if not GENAI_AVAILABLE:
-        return AIResponse(
-            content="I'm here to help! Please tell me what topic you'd like to study or what questions you have.",
-            has_notes=False,
-            has_questions=False
-        )
+        return _check_ai_data({
+            "content": "I'm here to help! Please tell me what topic you'd like to study or what questions you have."
+        })
 
-    model = genai.GenerativeModel('gemini-2.0-flash')
-    
-    messages_context = "\n".join([f"{msg['role']}: {msg['content']}" for msg in previous_messages[-6:]])
-    full_prompt = f"{system_prompt}\n\nConversation history:\n{messages_context}\n\nUser: {user_message}"
+    history = previous_messages[-6:]
+    if file_context_hash is None:
+        file_context_hash = _cache_key(file_context)
+    context_key = _cache_key(curriculum, language, file_context_hash)
+    cache_key = _cache_key(context_key, orjson.dumps(history, option=orjson.OPT_SORT_KEYS).decode(), user_message)
+
+    cached = get_cached_response(cache_key)
+    if cached is not None:
+        return cached
+
+    # Only reuse answers to similar questions when no earlier answer shapes this one
+    embedding = None
+    if not any(msg['role'] == "assistant" for msg in history):
+        embedding = await embed_message(user_message)
+        if embedding is not None:
+            cached = find_similar_response(context_key, embedding)
+            if cached is not None:
+                return cached
+
+    messages_context = "\n".join([f"{msg['role']}: {msg['content']}" for msg in history])
+    prefix = get_prompt_prefix(context_key, curriculum, language, file_context)
+    full_prompt = f"{prefix}{messages_context}\n\nUser: {user_message}"
     
     if file_context:
         full_prompt += f"\n\nPlease answer ONLY based on the above file content. If not found, respond with 'Sorry, I do not have information on that.'"
     
     try:
-        response = model.generate_content(full_prompt)
-        response_text = response.text
-
-        if response_text.startswith("```json"):
-            response_text = response_text[7:]
-        if response_text.endswith("```"):
-            response_text = response_text[:-3]
-        response_text = response_text.strip()
+        response = await gemini_batcher.process(full_prompt)
+        response_text = _FENCE_RE.sub("", response.text).strip()
         
-        ai_data = json.loads(response_text)
-        return AIResponse(**ai_data)
+        ai_data = _check_ai_data(orjson.loads(response_text))
+        cache_response(cache_key, ai_data)
+        if embedding is not None:
+            remember_similar_response(context_key, embedding, ai_data)
+        return ai_data
     except Exception as e:
         print(f"Error generating AI response: {e}")
-        return AIResponse(content="I'm here to help with your studies! What would you like to learn about?")
+        return _check_ai_data({"content": "I'm here to help with your studies! What would you like to learn about?"})
 
 # ----------------------
 # API Routes
@@ -211,12 +1022,11 @@ async def read_root():
 
 @app.get("/api/chats")
 async def get_chats():
-    chats = sorted(memory_chats.values(), key=lambda x: x['updated_at'], reverse=True)
-    return chats
+    return await storage.list_chats()
 
 @app.post("/api/chats")
 async def create_chat(chat: ChatCreate):
-    chat_id = str(uuid.uuid4())
+    chat_id = _new_id()
     now = datetime.now(timezone.utc).isoformat()
     chat_doc = {
         "id": chat_id,
@@ -226,46 +1036,39 @@ async def create_chat(chat: ChatCreate):
         "created_at": now,
         "updated_at": now
     }
-    memory_chats[chat_id] = chat_doc
+    await storage.create_chat(chat_doc)
     return chat_doc
 
 @app.get("/api/chats/{chat_id}")
 async def get_chat(chat_id: str):
-    chat = memory_chats.get(chat_id)
+    chat = await storage.get_chat(chat_id)
     if not chat:
         raise HTTPException(status_code=404, detail="Chat not found")
     return chat
 
 @app.delete("/api/chats/{chat_id}")
 async def delete_chat(chat_id: str):
-    if chat_id not in memory_chats:
+    if not await storage.get_chat(chat_id):
         raise HTTPException(status_code=404, detail="Chat not found")
     
     # Delete related messages and files
-    to_delete_msgs = [k for k, v in memory_messages.items() if v['chat_id'] == chat_id]
-    for k in to_delete_msgs:
-        del memory_messages[k]
-    
-    to_delete_files = [k for k, v in memory_files.items() if v['chat_id'] == chat_id]
-    for k in to_delete_files:
-        del memory_files[k]
+    for f in await storage.delete_chat(chat_id):
+        remove_extracted_text(f['extracted_text_path'])
+    file_context_cache.pop(chat_id, None)
     
-    del memory_chats[chat_id]
     return {"message": "Chat deleted successfully"}
 
 @app.get("/api/chats/{chat_id}/messages")
 async def get_messages(chat_id: str):
-    messages = [v for v in memory_messages.values() if v['chat_id'] == chat_id]
-    messages.sort(key=lambda x: x['created_at'])
-    return messages
+    return await storage.get_messages(chat_id)
 
 @app.post("/api/chats/{chat_id}/messages")
 async def send_message(chat_id: str, message: MessageCreate):
-    chat = memory_chats.get(chat_id)
+    chat = await storage.get_chat(chat_id)
     if not chat:
         raise HTTPException(status_code=404, detail="Chat not found")
     
-    user_msg_id = str(uuid.uuid4())
+    user_msg_id = _new_id()
     user_message_doc = {
         "id": user_msg_id,
         "chat_id": chat_id,
@@ -274,95 +1077,233 @@ async def send_message(chat_id: str, message: MessageCreate):
         "metadata": None,
         "created_at": datetime.now(timezone.utc).isoformat()
     }
-    memory_messages[user_msg_id] = user_message_doc
+    if not await storage.add_message(user_message_doc):
+        raise HTTPException(status_code=404, detail="Chat not found")
     
-    if message.role == "user":
-        previous_messages = [
-            {"role": v["role"], "content": v["content"]} 
-            for v in sorted(memory_messages.values(), key=lambda x: x['created_at'])
-            if v['chat_id'] == chat_id
-        ][-6:]
-        
-        file_context = ""
-        for file in memory_files.values():
-            if file['chat_id'] == chat_id:
-                file_context += f"{file['original_name']}:\n{file['extracted_text']}\n"
-                if file.get('questions'):
-                    file_context += "Questions from this book:\n"
-                    for q in file['questions']:
-                        file_context += q + "\n"
-        
-        ai_response = await generate_ai_response(
-            message.content,
-            chat["curriculum"],
-            chat["language"],
-            file_context,
-            previous_messages
-        )
-        
-        ai_msg_id = str(uuid.uuid4())
-        ai_message_doc = {
-            "id": ai_msg_id,
-            "chat_id": chat_id,
-            "role": "assistant",
-            "content": split_lines(ai_response.content),
-            "metadata": {
-                "has_notes": ai_response.has_notes,
-                "notes": ai_response.notes,
-                "has_questions": ai_response.has_questions,
-                "questions": [q.dict() for q in ai_response.questions] if ai_response.questions else None,
-                "follow_up_actions": ai_response.follow_up_actions
-            },
-            "created_at": datetime.now(timezone.utc).isoformat()
-        }
-        memory_messages[ai_msg_id] = ai_message_doc
-        
-        memory_chats[chat_id]["updated_at"] = datetime.now(timezone.utc).isoformat()
-        
-        return {
-            "user_message": user_message_doc,
-            "ai_message": ai_message_doc
-        }
+    if message.role != "user":
+        return {"message": user_message_doc}
     
-    return {"message": user_message_doc}
-
-import asyncio
+    previous_messages = [
+        {"role": m["role"], "content": m["content"]}
+        for m in await storage.get_messages(chat_id, last=6)
+    ]
+    
+    file_context, file_context_hash = get_file_context(chat_id, await storage.get_files(chat_id))
+    
+    ai_data = await generate_ai_response(
+        message.content,
+        chat["curriculum"],
+        chat["language"],
+        file_context,
+        previous_messages,
+        file_context_hash
+    )
+    
+    ai_msg_id = _new_id()
+    ai_message_doc = {
+        "id": ai_msg_id,
+        "chat_id": chat_id,
+        "role": "assistant",
+        "content": split_lines(ai_data["content"]),
+        "metadata": {
+            "has_notes": ai_data["has_notes"],
+            "notes": ai_data["notes"],
+            "has_questions": ai_data["has_questions"],
+            "questions": ai_data["questions"] or None,
+            "follow_up_actions": ai_data["follow_up_actions"]
+        },
+        "created_at": datetime.now(timezone.utc).isoformat()
+    }
+    # The chat may have been deleted while the reply was being generated
+    if not await storage.add_message(ai_message_doc, updated_at=datetime.now(timezone.utc).isoformat()):
+        raise HTTPException(status_code=404, detail="Chat not found")
+    
+    return {
+        "user_message": user_message_doc,
+        "ai_message": ai_message_doc
+    }
 
 @app.post("/api/chats/{chat_id}/upload")
 async def upload_files(chat_id: str, files: List[UploadFile] = File(...)):
     uploaded_files = []
 
-    async def process_file(file):
-        extracted_text = await extract_text_from_file(file)
-        questions_list = extract_questions(extracted_text)
+    if not await storage.get_chat(chat_id):
+        raise HTTPException(status_code=404, detail="Chat not found")
+
+    for file in files:
+        if file.size is not None and file.size > MAX_UPLOAD_SIZE:
+            raise _upload_too_large(file)
+
+    file_ids = [_new_id() for _ in files]
+    extracted_text_paths = [os.path.join(get_extracted_text_dir(), f"{file_id}.txt") for file_id in file_ids]
 
-        file_id = str(uuid.uuid4())
-        file_doc = {
+    async def process_file(file, file_id, extracted_text_path):
+        with ExtractedTextWriter(extracted_text_path) as extracted:
+            await extract_text_from_file(file, extracted)
+
+        return {
             "id": file_id,
             "chat_id": chat_id,
             "filename": file.filename,
             "original_name": file.filename,
             "mime_type": file.content_type or "application/octet-stream",
-            "size": str(len(extracted_text)),
-            "extracted_text": extracted_text,
-            "questions": questions_list,
+            "size": str(extracted.length),
+            "extracted_text_path": extracted_text_path,
+            "questions": extracted.questions,
             "uploaded_at": datetime.now(timezone.utc).isoformat()
         }
 
-        memory_files[file_id] = file_doc
-        return file_doc
+    tasks = [
+        asyncio.create_task(process_file(file, file_id, path))
+        for file, file_id, path in zip(files, file_ids, extracted_text_paths)
+    ]
+    try:
+        uploaded_files = await asyncio.gather(*tasks)
+    except BaseException:
+        # One file failed (e.g. over the size limit): save none of them
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for path in extracted_text_paths:
+            remove_extracted_text(path)
+        raise
 
-    tasks = [process_file(file) for file in files]
-    uploaded_files = await asyncio.gather(*tasks)
+    for i, file_doc in enumerate(uploaded_files):
+        if not await storage.add_file(file_doc):
+            # The chat was deleted mid-upload; its delete already removed the files added so far
+            for path in extracted_text_paths[i:]:
+                remove_extracted_text(path)
+            raise HTTPException(status_code=404, detail="Chat not found")
 
     return {"message": "Files uploaded successfully", "files": uploaded_files}
 
 @app.get("/api/chats/{chat_id}/files")
 async def get_files(chat_id: str):
-    files = [v for v in memory_files.values() if v['chat_id'] == chat_id]
+    files = list(await storage.get_files(chat_id))
     files.sort(key=lambda x: x['uploaded_at'], reverse=True)
     return files
 
+# Sub-requests accepted by a single /api/batch call
+MAX_BATCH_REQUESTS = 20
+
+def _batch_target(url: str, method: str) -> Optional[str]:
+    """Normalize a batch sub-request url, or return None if it must not be dispatched."""
+    try:
+        parsed = httpx.URL(url)
+    except httpx.InvalidURL:
+        return None
+    if parsed.is_absolute_url:
+        return None
+
+    # Resolve encodings and dot segments so the checks see the path that will be routed
+    path = posixpath.normpath(unquote(parsed.path))
+    if not path.startswith("/api/"):
+        return None
+
+    scope = {"type": "http", "path": path, "root_path": "", "method": method.upper()}
+    for route in app.router.routes:
+        match, _ = route.matches(scope)
+        if match != Match.NONE and getattr(route, "endpoint", None) is batch_requests:
+            return None
+
+    query = parsed.query.decode()
+    return f"{path}?{query}" if query else path
+
+def _batch_refs(value) -> set:
+    """Return the request ids referenced by templates anywhere in `value`."""
+    if isinstance(value, str):
+        return {m.group(1) for m in _BATCH_REF.finditer(value)}
+    if isinstance(value, dict):
+        return set().union(*(_batch_refs(v) for v in value.values()))
+    if isinstance(value, list):
+        return set().union(*(_batch_refs(v) for v in value))
+    return set()
+
+def _resolve_batch_ref(results: Dict[str, dict], match) -> Any:
+    value = results[match.group(1)]
+    for part in match.group(2).split(".")[1:]:
+        value = value[int(part)] if isinstance(value, list) else value[part]
+    return value
+
+def _substitute_batch_refs(value, results: Dict[str, dict], in_url: bool = False):
+    """Replace {{id.path}} templates with values from earlier responses.
+
+    A string that is a single template takes the referenced value as-is; otherwise
+    values are interpolated as text (percent-encoded inside urls).
+    """
+    if isinstance(value, str):
+        whole = _BATCH_REF.fullmatch(value)
+        if whole and not in_url:
+            return _resolve_batch_ref(results, whole)
+
+        def render(m):
+            text = str(_resolve_batch_ref(results, m))
+            return quote(text, safe="") if in_url else text
+        return _BATCH_REF.sub(render, value)
+    if isinstance(value, dict):
+        return {k: _substitute_batch_refs(v, results, in_url) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_substitute_batch_refs(v, results, in_url) for v in value]
+    return value
+
+@app.post("/api/batch")
+async def batch_requests(batch: BatchRequest):
+    """Run several API requests in one round-trip.
+
+    Requests run concurrently unless `dependsOn` lists earlier request ids, in
+    which case they wait for those and fail with 424 if any of them failed.
+    The url and body may reference those responses with templates such as
+    `{{1.body.id}}`, e.g. to send a message to a chat created earlier in the batch.
+    """
+    if len(batch.requests) > MAX_BATCH_REQUESTS:
+        raise HTTPException(status_code=400, detail=f"A batch can contain at most {MAX_BATCH_REQUESTS} requests")
+
+    seen_ids = set()
+    for item in batch.requests:
+        if item.id in seen_ids:
+            raise HTTPException(status_code=400, detail=f"Duplicate request id '{item.id}'")
+        if any(dep not in seen_ids for dep in item.dependsOn or []):
+            raise HTTPException(status_code=400, detail=f"Request '{item.id}' depends on an unknown or later request")
+        if not (_batch_refs(item.url) | _batch_refs(item.body)) <= set(item.dependsOn or []):
+            raise HTTPException(status_code=400, detail=f"Request '{item.id}' references a request it does not depend on")
+        # Templated urls are checked once their references are filled in
+        if not _batch_refs(item.url) and _batch_target(item.url, item.method) is None:
+            raise HTTPException(status_code=400, detail=f"Request '{item.id}' has an unsupported url")
+        seen_ids.add(item.id)
+
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://batch") as client:
+        tasks: Dict[str, asyncio.Task] = {}
+
+        async def run(item: BatchRequestItem):
+            results = {}
+            for dep in item.dependsOn or []:
+                results[dep] = await tasks[dep]
+                if results[dep]["status"] >= 400:
+                    return {"id": item.id, "status": 424, "body": None}
+
+            try:
+                url = _substitute_batch_refs(item.url, results, in_url=True)
+                body = _substitute_batch_refs(item.body, results)
+            except (LookupError, ValueError, TypeError):
+                return {"id": item.id, "status": 400, "body": {"detail": "Could not resolve a reference to an earlier response"}}
+            target = _batch_target(url, item.method)
+            if target is None:
+                return {"id": item.id, "status": 400, "body": {"detail": "Unsupported url"}}
+
+            response = await client.request(item.method, target, json=body, headers=item.headers)
+            try:
+                body = response.json() if response.content else None
+            except ValueError:
+                body = response.text
+            return {"id": item.id, "status": response.status_code, "body": body}
+
+        for item in batch.requests:
+            tasks[item.id] = asyncio.create_task(run(item))
+        responses = await asyncio.gather(*tasks.values())
+
+    return {"responses": responses}
+
 # ----------------------
 # Static Files
 # ----------------------
@@ -373,7 +1314,12 @@ if __name__ == "__main__":
     import uvicorn
     print("=" * 50)
     print("Starting Find AI - Educational Chatbot")
-    print("Using in-memory storage (data will be lost on restart)")
+    if USE_REDIS:
+        print("Using Redis storage")
+    else:
+        print("Using in-memory storage (data will be lost on restart)")
     print(f"Gemini API: {'✓ Configured' if GENAI_AVAILABLE else '✗ Not available'}")
+    print(f"Workers: {WORKERS}")
     print("=" * 50)
-    uvicorn.run(app, host="0.0.0.0", port=5002)
+    # An import string is required for uvicorn to spawn more than one worker
+    uvicorn.run("main:app", host="0.0.0.0", port=5002, workers=WORKERS)